@@ -258,6 +258,9 @@ class InterfaceResult(object):
         * returncode : The code returned from running the ``cmdline``.
 
     """
+    # a result is created for every node that is run, so avoid giving
+    # each of them an instance dictionary
+    __slots__ = ('_version', 'interface', 'runtime', 'inputs', 'outputs')
 
     def __init__(self, interface, runtime, inputs=None, outputs=None):
         self._version = 1.0
@@ -266,6 +269,14 @@ class InterfaceResult(object):
         self.inputs = inputs
         self.outputs = outputs
 
+    def __getstate__(self):
+        return dict((name, getattr(self, name)) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        # also restores results pickled before __slots__ were used
+        for name, value in state.items():
+            setattr(self, name, value)
+
     @property
     def version(self):
         return self._version
@@ -895,7 +906,7 @@ class BaseInterface(Interface):
         self._check_version_requirements(self.inputs)
         interface = self.__class__
         # initialize provenance tracking
-        env = deepcopy(os.environ.data)
+        env = dict(os.environ)
         runtime = Bunch(cwd=os.getcwd(),
                         returncode=None,
                         duration=None,
@@ -1246,7 +1257,7 @@ class CommandLine(BaseInterface):
     def version_from_command(self, flag='-v'):
         cmdname = self.cmd.split()[0]
         if self._exists_in_path(cmdname):
-            env = deepcopy(os.environ.data)
+            env = dict(os.environ)
             out_environ = self._get_environ()
             env.update(out_environ)
             proc = subprocess.Popen(' '.join((cmdname, flag)),
@@ -1428,7 +1439,7 @@ class StdOutCommandLine(CommandLine):
     input_spec = StdOutCommandLineInputSpec
 
     def _gen_filename(self, name):
-        if name is 'out_file':
+        if name == 'out_file':
             return self._gen_outfilename()
         else:
             return None
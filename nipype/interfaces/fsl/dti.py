@@ -147,7 +147,7 @@ class EddyCorrect(FSLCommand):
         return outputs
 
     def _gen_filename(self, name):
-        if name is 'out_file':
+        if name == 'out_file':
             return self._list_outputs()['eddy_corrected']
         else:
             return None
@@ -559,7 +559,7 @@ class VecReg(FSLCommand):
         return outputs
 
     def _gen_filename(self, name):
-        if name is 'out_file':
+        if name == 'out_file':
             return self._list_outputs()[name]
         else:
             return None
@@ -654,7 +654,7 @@ class FindTheBiggest(FSLCommand):
         return outputs
 
     def _gen_filename(self, name):
-        if name is 'out_file':
+        if name == 'out_file':
             return self._list_outputs()[name]
         else:
             return None
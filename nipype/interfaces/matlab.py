@@ -1,31 +1,201 @@
 # emacs: -*- mode: python; py-indent-offset: 4; indent-tabs-mode: nil -*-
 # vi: set ft=python sts=4 ts=4 sw=4 et:
 """ General matlab interface code """
+import atexit
 import os
+import subprocess
+import threading
 
 from nipype.interfaces.base import (CommandLineInputSpec, InputMultiPath, isdefined,
                                     CommandLine, traits, File, Directory)
 from .. import config
 
+def find_matlab(matlab_cmd):
+    """Returns the full path of the executable started by `matlab_cmd`
+    or None if it cannot be found.
+
+    Only the search path is inspected, matlab itself is not started.
+    """
+    parts = matlab_cmd.split()
+    if not parts:
+        # e.g. MATLABCMD set but empty
+        return None
+    cmd = parts[0]
+    if os.path.dirname(cmd):
+        candidates = [cmd]
+    else:
+        candidates = [os.path.join(directory, cmd) for directory in
+                      os.environ.get("PATH", "").split(os.pathsep)]
+    for filename in candidates:
+        if os.path.isfile(filename) and os.access(filename, os.X_OK):
+            return filename
+    return None
+
 def get_matlab_command():
     if 'NIPYPE_NO_MATLAB' in os.environ:
         return None
 
-    try:
-        matlab_cmd = os.environ['MATLABCMD']
-    except:
-        matlab_cmd = 'matlab'
-
-    try:
-        res = CommandLine(command='which', args=matlab_cmd,
-                          terminal_output='allatonce').run()
-        matlab_path = res.runtime.stdout.strip()
-    except Exception, e:
+    matlab_cmd = os.environ.get('MATLABCMD', 'matlab')
+    if find_matlab(matlab_cmd) is None:
         return None
     return matlab_cmd
 
 no_matlab = get_matlab_command() is None
 
+_active_sessions = []
+_persistent_sessions = {}
+_persistent_sessions_lock = threading.Lock()
+_use_persistent_sessions = False
+
+
+def get_active_session():
+    """Returns the innermost running `MatlabSession` or None"""
+    if _active_sessions:
+        return _active_sessions[-1]
+    return None
+
+
+def get_persistent_session(matlab_cmd):
+    """Returns the process wide `MatlabSession` for `matlab_cmd`
+
+    The session is created on first use and matlab is stopped when python
+    exits. Sessions are not shared between processes, so a forked child
+    starts its own.
+    """
+    key = (os.getpid(), matlab_cmd)
+    with _persistent_sessions_lock:
+        if key not in _persistent_sessions:
+            _persistent_sessions[key] = MatlabSession(matlab_cmd=matlab_cmd)
+        return _persistent_sessions[key]
+
+
+def use_persistent_sessions(use=True):
+    """Makes every `MatlabCommand` of this process run in the persistent
+    session for its matlab command, as the ``persistent_matlab`` option
+    does, independent of the node configuration."""
+    global _use_persistent_sessions
+    _use_persistent_sessions = use
+
+
+def close_persistent_sessions():
+    """Stops the persistent sessions started by this process"""
+    pid = os.getpid()
+    with _persistent_sessions_lock:
+        for key, session in _persistent_sessions.items():
+            if key[0] == pid:
+                session.close()
+                del _persistent_sessions[key]
+
+atexit.register(close_persistent_sessions)
+
+
+class MatlabSession(object):
+    """A single matlab process that is kept alive to run several scripts
+
+    Within a ``with`` block, every `MatlabCommand` (and therefore every
+    SPM interface) sends its code to the running session instead of
+    starting a new matlab process, so matlab and SPM are only started
+    once, when the first script is run. Interfaces configured with a
+    different matlab command than the session, and interfaces using the
+    MCR, still run as separate processes.
+
+    >>> import nipype.interfaces.matlab as matlab
+    >>> with matlab.MatlabSession() as session: # doctest: +SKIP
+    ...     realign.run()
+    ...     smooth.run()
+    """
+
+    _sentinel = '__NIPYPE_DONE__'
+
+    def __init__(self, matlab_cmd=None, single_comp_thread=None):
+        if matlab_cmd is None:
+            # the same default as MatlabCommand, so that interfaces
+            # without their own matlab command use this session
+            matlab_cmd = MatlabCommand._default_matlab_cmd or \
+                MatlabCommand._cmd
+        self.matlab_cmd = matlab_cmd
+        if single_comp_thread is None:
+            single_comp_thread = config.getboolean('execution',
+                                                   'single_thread_matlab')
+        self.single_comp_thread = single_comp_thread
+        self._proc = None
+        # scripts from several threads must not interleave on the pipes
+        self._lock = threading.Lock()
+
+    @property
+    def cmdline(self):
+        args = [self.matlab_cmd, '-nodesktop', '-nosplash']
+        if self.single_comp_thread:
+            args.append('-singleCompThread')
+        return ' '.join(args)
+
+    def start(self):
+        """Starts the matlab process if it is not running"""
+        if self._proc is None or self._proc.poll() is not None:
+            self._proc = subprocess.Popen(self.cmdline, shell=True,
+                                          stdin=subprocess.PIPE,
+                                          stdout=subprocess.PIPE,
+                                          stderr=subprocess.STDOUT)
+        return self
+
+    def run_script(self, script, cwd=None):
+        """Runs m-code in the session and returns its (merged) output
+
+        Parameters
+        ----------
+        script : string
+            m-code to evaluate
+        cwd : string
+            directory to change into while the code runs, default
+            os.getcwd()
+        """
+        if cwd is None:
+            cwd = os.getcwd()
+        # every script starts with an empty workspace, as it would in a
+        # new matlab process, so e.g. SPM jobs are not merged
+        lines = ["clear variables; nipype_path = path; cd('%s'); rehash;" %
+                 cwd,
+                 script,
+                 "path(nipype_path); clear nipype_path;",
+                 "fprintf(1, '\\n%s\\n');\n" % self._sentinel]
+        with self._lock:
+            self.start()
+            self._proc.stdin.write('\n'.join(lines))
+            self._proc.stdin.flush()
+            output = []
+            while True:
+                line = self._proc.stdout.readline()
+                if not line:
+                    raise RuntimeError('matlab session terminated:\n%s' %
+                                       ''.join(output))
+                if line.strip() == self._sentinel:
+                    break
+                output.append(line)
+        return ''.join(output)
+
+    def close(self):
+        """Stops the matlab process"""
+        with self._lock:
+            if self._proc is not None:
+                if self._proc.poll() is None:
+                    try:
+                        self._proc.stdin.write('exit;\n')
+                        self._proc.stdin.flush()
+                    except IOError:
+                        pass
+                    self._proc.communicate()
+                self._proc = None
+
+    def __enter__(self):
+        _active_sessions.append(self)
+        return self
+
+    def __exit__(self, exc, value, tb):
+        _active_sessions.remove(self)
+        self.close()
+        return False
+
+
 class MatlabInputSpec(CommandLineInputSpec):
     """ Basic expected inputs to Matlab interface """
 
@@ -75,6 +245,8 @@ class MatlabCommand(CommandLine):
     _default_mfile = None
     _default_paths = None
     input_spec = MatlabInputSpec
+    # set to False to always start a new matlab, e.g. for one-off queries
+    use_session = True
 
     def __init__(self, matlab_cmd = None, **inputs):
         """initializes interface to matlab
@@ -135,6 +307,9 @@ class MatlabCommand(CommandLine):
 
     def _run_interface(self,runtime):
         self.inputs.terminal_output = 'allatonce'
+        session = self._get_session()
+        if session is not None:
+            return self._run_in_session(session, runtime)
         runtime = super(MatlabCommand, self)._run_interface(runtime)
         try:
             # Matlab can leave the terminal in a barbbled state
@@ -146,6 +321,38 @@ class MatlabCommand(CommandLine):
             self.raise_exception(runtime)
         return runtime
 
+    def _get_session(self):
+        """Returns the `MatlabSession` to run the script in or None
+
+        The active session is only used if it runs the same matlab
+        command as this interface. Otherwise the persistent session for
+        the command is used if persistent sessions are enabled, or else
+        matlab is started for this script alone (None).
+        """
+        if self.inputs.uses_mcr or not self.use_session:
+            return None
+        session = get_active_session()
+        if session is not None and session.matlab_cmd == self._cmd:
+            return session
+        if _use_persistent_sessions or \
+                config.getboolean('execution', 'persistent_matlab'):
+            return get_persistent_session(self._cmd)
+        return None
+
+    def _run_in_session(self, session, runtime):
+        """Runs the script in a running `MatlabSession`"""
+        script = self._gen_matlab_command('%s', self.inputs.script)
+        runtime.cmdline = script
+        output = session.run_script(script, cwd=runtime.cwd)
+        runtime.returncode = 0
+        runtime.stdout = output
+        runtime.stderr = ''
+        runtime.merged = output
+        if 'MATLAB code threw an exception' in output:
+            runtime.stderr = output
+            self.raise_exception(runtime)
+        return runtime
+
     def _format_arg(self, name, trait_spec, value):
         if name in ['script']:
             argstr = trait_spec.argstr
@@ -160,8 +367,9 @@ class MatlabCommand(CommandLine):
         paths = []
         if isdefined(self.inputs.paths):
             paths = self.inputs.paths
-        # prescript
-        prescript = self.inputs.prescript
+        # copy the prescript, so that repeated calls do not keep
+        # inserting into the input
+        prescript = list(self.inputs.prescript)
         postscript = self.inputs.postscript
 
         #postcript takes different default value depending on the mfile argument
@@ -172,19 +380,20 @@ class MatlabCommand(CommandLine):
         for path in paths:
             prescript.append("addpath('%s');\n" % path)
 
-        if not mfile:
-            #clean up the code of comments and replace newlines with commas
-            script_lines = ','.join([line for line in script_lines.split("\n") if not line.strip().startswith("%")])
-
-        script_lines = '\n'.join(prescript)+script_lines+'\n'.join(postscript)
         if mfile:
-            mfile = file(os.path.join(cwd,self.inputs.script_file), 'wt')
-            mfile.write(script_lines)
-            mfile.close()
+            # SPM jobs for many files can be large, so the pieces are
+            # written one after the other instead of being joined first
+            with open(os.path.join(cwd, self.inputs.script_file), 'wt') as fp:
+                fp.write('\n'.join(prescript))
+                fp.write(script_lines)
+                fp.write('\n'.join(postscript))
             if self.inputs.uses_mcr:
                 script = '%s' % (os.path.join(cwd,self.inputs.script_file))
             else:
                 script = "addpath('%s');%s" % (cwd, self.inputs.script_file.split('.')[0])
         else:
-            script = ''.join(script_lines.split('\n'))
+            #clean up the code of comments and replace newlines with commas
+            script_lines = ','.join([line for line in script_lines.split("\n") if not line.strip().startswith("%")])
+            script = ''.join(prescript + [script_lines] +
+                             list(postscript)).replace('\n', '')
         return argstr % script
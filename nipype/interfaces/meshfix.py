@@ -110,7 +110,7 @@ class MeshFix(CommandLine):
 	return outputs
 
     def _gen_filename(self, name):
-	if name is 'out_filename':
+	if name == 'out_filename':
 	    return self._gen_outfilename()
 	else:
 	    return None
@@ -225,7 +225,7 @@ class MRTrix2TrackVis(BaseInterface):
         return outputs
 
 	def _gen_filename(self, name):
-		if name is 'out_filename':
+		if name == 'out_filename':
 			return self._gen_outfilename()
 		else:
 			return None
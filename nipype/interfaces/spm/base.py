@@ -6,7 +6,7 @@ __docformat__ = 'restructuredtext'
 
 # Standard library imports
 import os
-from copy import deepcopy
+from tempfile import mkstemp
 
 # Third-party imports
 from nibabel import load
@@ -16,21 +16,37 @@ from scipy.io import savemat
 # Local imports
 from ..base import (BaseInterface, traits, isdefined, InputMultiPath,
                     BaseInterfaceInputSpec, Directory, Undefined)
-from ..matlab import MatlabCommand
+from ..matlab import MatlabCommand, find_matlab
 from ...utils import spm_docs as sd
+from ...utils.tmpdirs import InTemporaryDirectory
 
-from ... import logging
+from ... import config, logging
 logger = logging.getLogger('interface')
 
 
+_shape_cache = {}
+
+
+def _get_shape(fname):
+    """Returns the image shape of `fname`.
+
+    Shapes are cached per file name and modification time, so that
+    repeatedly converting the same files only reads their header once.
+    """
+    stat = os.stat(fname)
+    key = (os.path.abspath(fname), stat.st_mtime, stat.st_size)
+    if key not in _shape_cache:
+        _shape_cache[key] = load(fname).get_shape()
+    return _shape_cache[key]
+
+
 def func_is_3d(in_file):
     """Checks if input functional files are 3d."""
 
-    if isinstance(in_file, list):
+    if isinstance(in_file, (list, tuple)):
         return func_is_3d(in_file[0])
     else:
-        img = load(in_file)
-        shape = img.get_shape()
+        shape = _get_shape(in_file)
         if len(shape) == 3 or (len(shape) == 4 and shape[3] == 1):
             return True
         else:
@@ -40,7 +56,7 @@ def func_is_3d(in_file):
 def get_first_3dfile(in_files):
     if not func_is_3d(in_files):
         return None
-    if isinstance(in_files[0], list):
+    if isinstance(in_files[0], (list, tuple)):
         return in_files[0]
     return in_files
 
@@ -52,20 +68,15 @@ def scans_for_fname(fname):
     Opens images so will fail if they are not found.
 
     """
-    if isinstance(fname, list):
-        scans = np.zeros((len(fname),), dtype=object)
-        for sno, f in enumerate(fname):
-            scans[sno] = '%s,1' % f
-        return scans
-    img = load(fname)
-    if len(img.get_shape()) == 3:
-        return np.array(('%s,1' % fname,), dtype=object)
+    if isinstance(fname, (list, tuple)):
+        return np.array(['%s,1' % f for f in fname], dtype=object)
+    shape = _get_shape(fname)
+    if len(shape) == 3:
+        n_scans = 1
     else:
-        n_scans = img.get_shape()[3]
-        scans = np.zeros((n_scans,), dtype=object)
-        for sno in range(n_scans):
-            scans[sno] = '%s,%d' % (fname, sno + 1)
-        return scans
+        n_scans = shape[3]
+    return np.array(['%s,%d' % (fname, sno + 1) for sno in range(n_scans)],
+                    dtype=object)
 
 
 def scans_for_fnames(fnames, keep4d=False, separate_sessions=False):
@@ -80,38 +91,93 @@ def scans_for_fnames(fnames, keep4d=False, separate_sessions=False):
         ensures a cell array per session is created in the structure.
 
     """
-    flist = None
-    if not isinstance(fnames[0], list):
+    if not isinstance(fnames[0], (list, tuple)):
         if func_is_3d(fnames[0]):
             fnames = [fnames]
-    if separate_sessions or keep4d:
-        flist = np.zeros((len(fnames),), dtype=object)
+    if not (separate_sessions or keep4d):
+        return np.concatenate([scans_for_fname(f) for f in fnames])
+    flist = np.zeros((len(fnames),), dtype=object)
     for i, f in enumerate(fnames):
         if separate_sessions:
             if keep4d:
-                if isinstance(f, list):
+                if isinstance(f, (list, tuple)):
                     flist[i] = np.array(f, dtype=object)
                 else:
                     flist[i] = np.array([f], dtype=object)
             else:
                 flist[i] = scans_for_fname(f)
         else:
-            if keep4d:
-                flist[i] = f
-            else:
-                scans = scans_for_fname(f)
-                if flist is None:
-                    flist = scans
-                else:
-                    flist = np.concatenate((flist, scans))
+            flist[i] = f
     return flist
 
 
+_object_dtype = np.dtype(object)
+# jobs whose top level is a struct, i.e. indexed with parentheses
+_struct_jobs = frozenset(['st', 'smooth', 'preproc', 'preproc8', 'fmri_spec',
+                          'fmri_est', 'factorial_design', 'defs'])
+_job_fields_cache = {}
+_job_cache = {}
+_job_cache_size = 128
+# total length of the cached job code; the keys hold about as much data
+_job_cache_max_chars = 2 ** 23
+_job_cache_stats = dict(hits=0, misses=0, chars=0)
+
+
+def _freeze_job(contents):
+    """Returns a hashable representation of an spm job structure.
+
+    Scalars keep their type in the key, since e.g. 1 and 1.0 or 1 and '1'
+    generate different matlab code.
+    """
+    if isinstance(contents, dict):
+        return (dict, tuple(sorted((key, _freeze_job(val))
+                                   for key, val in contents.items())))
+    if isinstance(contents, (list, tuple)):
+        return (list, tuple([_freeze_job(val) for val in contents]))
+    if isinstance(contents, np.ndarray):
+        values = contents.tolist()
+        if contents.dtype == _object_dtype and contents.ndim == 1 and \
+                all([isinstance(val, str) for val in values]):
+            # file names, possibly thousands of them, need no recursion
+            return (np.ndarray, str(contents.dtype), contents.shape, str,
+                    tuple(values))
+        # str() of a structured dtype includes the field names, which end
+        # up in the generated code
+        return (np.ndarray, str(contents.dtype), contents.shape,
+                _freeze_job(values))
+    return (type(contents), contents)
+
+
+def _matlab_mtime(matlab_cmd):
+    """Returns the modification time of the matlab executable used by
+    `matlab_cmd` or None if it cannot be found."""
+    filename = find_matlab(matlab_cmd)
+    if filename is None:
+        return None
+    return os.path.getmtime(os.path.realpath(filename))
+
+
+def _spm_mtime(spm_path):
+    """Returns the modification time of spm.m in `spm_path` or None if
+    it does not exist."""
+    filename = os.path.join(spm_path or '', 'spm.m')
+    if not os.path.isfile(filename):
+        return None
+    return os.path.getmtime(filename)
+
+
 class Info(object):
     """Handles SPM version information
+
+    The version information is cached per matlab command and MATLABPATH,
+    both in memory and in the nipype data file, so that matlab only has
+    to be started again when the matlab executable or SPM (its spm.m)
+    changes.
     """
-    @staticmethod
-    def version(matlab_cmd=None):
+    _version_cache = {}
+
+    @classmethod
+    def version(cls, matlab_cmd=None):
         """Returns the path to the SPM directory in the Matlab path
         If path not found, returns None.
 
@@ -130,10 +196,44 @@ class Info(object):
             returns None of path not found
         """
         if matlab_cmd is None:
+            matlab_cmd = os.environ.get('MATLABCMD',
+                                        'matlab -nodesktop -nosplash')
+        # a different MATLABPATH can select a different SPM
+        key = '%s|%s' % (matlab_cmd, os.environ.get('MATLABPATH', ''))
+        if key in cls._version_cache:
+            return cls._version_cache[key]
+        mtime = _matlab_mtime(matlab_cmd)
+        if mtime is not None:
             try:
-                matlab_cmd = os.environ['MATLABCMD']
-            except:
-                matlab_cmd = 'matlab -nodesktop -nosplash'
+                cached = (config.get_data('spm_info') or {}).get(key)
+            except Exception, e:
+                logger.debug(str(e))
+                cached = None
+            if cached and cached['mtime'] == mtime and \
+                    cached.get('spm_mtime') is not None and \
+                    cached['spm_mtime'] == \
+                    _spm_mtime(cached['version'].get('path')):
+                out_dict = dict((str(name), str(val)) for name, val in
+                                cached['version'].items())
+                cls._version_cache[key] = out_dict
+                return out_dict
+        out_dict = cls._query_version(matlab_cmd)
+        if out_dict is not None:
+            cls._version_cache[key] = out_dict
+            spm_mtime = _spm_mtime(out_dict.get('path'))
+            if mtime is not None and spm_mtime is not None:
+                try:
+                    spm_info = config.get_data('spm_info') or {}
+                    spm_info[key] = dict(mtime=mtime, spm_mtime=spm_mtime,
+                                         version=out_dict)
+                    config.save_data('spm_info', spm_info)
+                except Exception, e:
+                    logger.debug(str(e))
+        return out_dict
+
+    @staticmethod
+    def _query_version(matlab_cmd):
+        """Starts matlab to look up the SPM path, name and release"""
         mlab = MatlabCommand(matlab_cmd=matlab_cmd)
         mlab.inputs.script = """
 if isempty(which('spm')),
@@ -142,11 +242,14 @@ end;
 spm_path = spm('dir');
 [name, version] = spm('ver');
 fprintf(1, 'NIPYPE path:%s|name:%s|release:%s', spm_path, name, version);
-exit;
         """
         mlab.inputs.mfile = False
+        # do not keep a matlab running (and idle) for this single query
+        mlab.use_session = False
         try:
-            out = mlab.run()
+            # keep anything matlab writes out of the working directory
+            with InTemporaryDirectory():
+                out = mlab.run()
         except (IOError, RuntimeError), e:
             # if no Matlab at all -- exception could be raised
             # No Matlab -- no spm
@@ -175,7 +278,9 @@ def no_spm():
 class SPMCommandInputSpec(BaseInterfaceInputSpec):
     matlab_cmd = traits.Str(desc='matlab command to use')
     paths = InputMultiPath(Directory(), desc='Paths to add to matlabpath')
-    mfile = traits.Bool(True, desc='Run m-code using m-file',
+    mfile = traits.Bool(True, desc=('Run m-code using m-file. The job is '
+                                    'then written into the m-file itself; '
+                                    'otherwise it is passed in a .mat file'),
                         usedefault=True)
     use_mcr = traits.Bool(desc='Run m-code using SPM MCR')
 
@@ -193,6 +298,7 @@ class SPMCommand(BaseInterface):
     _matlab_cmd = None
     _paths = None
     _use_mcr = None
+    _jobfile = None
 
     def __init__(self, **inputs):
         super(SPMCommand, self).__init__(**inputs)
@@ -241,13 +347,24 @@ class SPMCommand(BaseInterface):
 
     def _run_interface(self, runtime):
         """Executes the SPM function using MATLAB."""
-        self.mlab.inputs.script = self._make_matlab_command(
-            deepcopy(self._parse_inputs()))
-        results = self.mlab.run()
+        # _parse_inputs builds a new job structure on every call and
+        # _make_matlab_command only reads it, so no copy is needed
+        try:
+            self.mlab.inputs.script = self._make_matlab_command(
+                self._parse_inputs())
+            results = self.mlab.run()
+        finally:
+            # the temporary .mat file of the job, if there is one
+            if self._jobfile is not None:
+                if os.path.exists(self._jobfile):
+                    os.unlink(self._jobfile)
+                self._jobfile = None
         runtime.returncode = results.runtime.returncode
         if self.mlab.inputs.uses_mcr:
             if 'Skipped' in results.runtime.stdout:
-                self.raise_exception(runtime)
+                # SPMCommand is not a CommandLine, report through the
+                # matlab interface which holds the command line and output
+                self.mlab.raise_exception(results.runtime)
         runtime.stdout = results.runtime.stdout
         runtime.stderr = results.runtime.stderr
         runtime.merged = results.runtime.merged
@@ -265,26 +382,34 @@ class SPMCommand(BaseInterface):
         else:
             return val
 
+    def _job_fields(self):
+        """Returns (name, spec, field path) for all inputs with a `field`
+
+        The field paths only depend on the input spec, so they are split
+        once per input spec class and reused afterwards. Their parts are
+        interned, since they are used as keys of every job dictionary.
+        """
+        spec_class = self.inputs.__class__
+        if spec_class not in _job_fields_cache:
+            metadata = dict(field=lambda t: t is not None)
+            _job_fields_cache[spec_class] = \
+                [(name, spec, tuple([intern(str(f))
+                                     for f in spec.field.split('.')]))
+                 for name, spec in self.inputs.traits(**metadata).items()]
+        return _job_fields_cache[spec_class]
+
     def _parse_inputs(self, skip=()):
         spmdict = {}
-        metadata = dict(field=lambda t: t is not None)
-        for name, spec in self.inputs.traits(**metadata).items():
+        for name, spec, fields in self._job_fields():
             if skip and name in skip:
                 continue
             value = getattr(self.inputs, name)
             if not isdefined(value):
                 continue
-            field = spec.field
-            if '.' in field:
-                fields = field.split('.')
-                dictref = spmdict
-                for f in fields[:-1]:
-                    if f not in dictref.keys():
-                        dictref[f] = {}
-                    dictref = dictref[f]
-                dictref[fields[-1]] = self._format_arg(name, spec, value)
-            else:
-                spmdict[field] = self._format_arg(name, spec, value)
+            dictref = spmdict
+            for f in fields[:-1]:
+                dictref = dictref.setdefault(f, {})
+            dictref[fields[-1]] = self._format_arg(name, spec, value)
         return [spmdict]
 
     def _reformat_dict_for_savemat(self, contents):
@@ -316,7 +441,11 @@ class SPMCommand(BaseInterface):
             print 'Requires dict input'
 
     def _generate_job(self, prefix='', contents=None):
-        """Recursive function to generate spm job specification as a string
+        """Generate spm job specification as a string
+
+        The job structure is walked depth-first with an explicit stack
+        rather than by recursion, and the matlab statements are
+        collected in a list that is joined once at the end.
 
         Parameters
         ----------
@@ -328,55 +457,125 @@ class SPMCommand(BaseInterface):
             matlab commands.
 
         """
-        jobstring = ''
         if contents is None:
-            return jobstring
-        if isinstance(contents, list):
-            for i, value in enumerate(contents):
-                if prefix.endswith(")"):
-                    newprefix = "%s,%d)" % (prefix[:-1], i + 1)
-                else:
-                    newprefix = "%s(%d)" % (prefix, i + 1)
-                jobstring += self._generate_job(newprefix, value)
-            return jobstring
-        if isinstance(contents, dict):
-            for key, value in contents.items():
-                newprefix = "%s.%s" % (prefix, key)
-                jobstring += self._generate_job(newprefix, value)
-            return jobstring
-        if isinstance(contents, np.ndarray):
-            if contents.dtype == np.dtype(object):
-                if prefix:
-                    jobstring += "%s = {...\n" % (prefix)
-                else:
-                    jobstring += "{...\n"
-                for i, val in enumerate(contents):
-                    if isinstance(val, np.ndarray):
-                        jobstring += self._generate_job(prefix=None,
-                                                        contents=val)
-                    elif isinstance(val, str):
-                        jobstring += '\'%s\';...\n' % (val)
+            return ''
+        parts = []
+        # entries are either (prefix, contents) pairs that still need
+        # to be expanded or literal strings that are emitted as is
+        stack = [(prefix, contents)]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, str):
+                parts.append(item)
+                continue
+            prefix, contents = item
+            if contents is None:
+                continue
+            children = []
+            if isinstance(contents, (list, tuple)):
+                for i, value in enumerate(contents):
+                    if prefix.endswith(")"):
+                        newprefix = "%s,%d)" % (prefix[:-1], i + 1)
                     else:
-                        jobstring += '%s;...\n' % str(val)
-                jobstring += '};\n'
-            else:
-                for i, val in enumerate(contents):
-                    for field in val.dtype.fields:
-                        if prefix:
-                            newprefix = "%s(%d).%s" % (prefix, i + 1, field)
+                        newprefix = "%s(%d)" % (prefix, i + 1)
+                    children.append((newprefix, value))
+            elif isinstance(contents, dict):
+                for key, value in contents.items():
+                    newprefix = "%s.%s" % (prefix, key)
+                    children.append((newprefix, value))
+            elif isinstance(contents, np.ndarray):
+                if contents.dtype == _object_dtype:
+                    if prefix:
+                        header = "%s = {...\n" % (prefix)
+                    else:
+                        header = "{...\n"
+                    values = list(contents)
+                    if all([isinstance(val, str) for val in values]):
+                        # cell array of strings, e.g. file names from
+                        # scans_for_fnames: emit it in one go
+                        parts.append(''.join([header] +
+                                             ["'%s';...\n" % val
+                                              for val in values] +
+                                             ['};\n']))
+                        continue
+                    children.append(header)
+                    for val in values:
+                        if isinstance(val, np.ndarray):
+                            children.append((None, val))
+                        elif isinstance(val, str):
+                            children.append('\'%s\';...\n' % (val))
                         else:
-                            newprefix = "(%d).%s" % (i + 1, field)
-                        jobstring += self._generate_job(newprefix,
-                                                        val[field])
-            return jobstring
-        if isinstance(contents, str):
-            jobstring += "%s = '%s';\n" % (prefix, contents)
+                            children.append('%s;...\n' % str(val))
+                    children.append('};\n')
+                else:
+                    for i, val in enumerate(contents):
+                        for field in val.dtype.fields:
+                            if prefix:
+                                newprefix = "%s(%d).%s" % (prefix, i + 1,
+                                                           field)
+                            else:
+                                newprefix = "(%d).%s" % (i + 1, field)
+                            children.append((newprefix, val[field]))
+            elif isinstance(contents, str):
+                parts.append("%s = '%s';\n" % (prefix, contents))
+            else:
+                parts.append("%s = %s;\n" % (prefix, str(contents)))
+            stack.extend(reversed(children))
+        return ''.join(parts)
+
+    def _jobdef_file(self, cwd):
+        """Returns the name of the .mat file used to pass the job to matlab
+
+        The file is created in shared memory (/dev/shm) when it is
+        available, so that the job does not have to go through the
+        (possibly network mounted) working directory. It is removed by
+        `_run_interface` once matlab has finished, or failed. Otherwise
+        pyjobs_<jobname>.mat in `cwd` is used.
+        """
+        shm = '/dev/shm'
+        if os.path.isdir(shm) and os.access(shm, os.W_OK):
+            fd, jobfile = mkstemp(suffix='.mat', dir=shm,
+                                  prefix='pyjobs_%s_' % self.jobname)
+            os.close(fd)
+            return jobfile
+        return os.path.join(cwd, 'pyjobs_%s.mat' % self.jobname)
+
+    def _generate_cached_job(self, prefix, contents):
+        """Returns `_generate_job(prefix, contents)`, reusing the result
+        of a previous call with identical job contents."""
+        try:
+            key = (self.__class__, prefix, _freeze_job(contents))
+            hash(key)
+        except (TypeError, RuntimeError):
+            # unhashable or too deeply nested to freeze
+            return self._generate_job(prefix, contents)
+        if key in _job_cache:
+            _job_cache_stats['hits'] += 1
+            return _job_cache[key]
+        _job_cache_stats['misses'] += 1
+        jobstring = self._generate_job(prefix, contents)
+        if len(jobstring) > _job_cache_max_chars / 8:
+            # a few huge jobs would push out everything else
             return jobstring
-        jobstring += "%s = %s;\n" % (prefix, str(contents))
+        if len(_job_cache) >= _job_cache_size or \
+                _job_cache_stats['chars'] + len(jobstring) > \
+                _job_cache_max_chars:
+            _job_cache.clear()
+            _job_cache_stats['chars'] = 0
+        _job_cache[key] = jobstring
+        _job_cache_stats['chars'] += len(jobstring)
         return jobstring
 
     def _make_matlab_command(self, contents, postscript=None):
         """Generates a mfile to build job structure
+
+        With `mfile` set (the default) the job is spelled out as matlab
+        assignments in the script, so no .mat file has to be written by
+        python and loaded by matlab. The .mat exchange is only used when
+        the code is passed on the matlab command line (`mfile` False),
+        because the cell array continuations generated by `_generate_job`
+        cannot be joined into a single line.
+
         Parameters
         ----------
 
@@ -394,7 +593,7 @@ class SPMCommand(BaseInterface):
 
         """
         cwd = os.getcwd()
-        mscript = """
+        mscript = ["""
         %% Generated by nipype.interfaces.spm
         if isempty(which('spm')),
              throw(MException('SPMCheck:NotFound','SPM not in matlab path'));
@@ -405,35 +604,35 @@ class SPMCommand(BaseInterface):
         spm('Defaults','fMRI');
 
         if strcmp(spm('ver'),'SPM8'), spm_jobman('initcfg');end\n
-        """
+        """]
         if self.mlab.inputs.mfile:
-            if self.jobname in ['st', 'smooth', 'preproc', 'preproc8',
-                                'fmri_spec', 'fmri_est', 'factorial_design',
-                                'defs']:
+            if self.jobname in _struct_jobs:
                 # parentheses
-                mscript += self._generate_job('jobs{1}.%s{1}.%s(1)' %
-                                              (self.jobtype, self.jobname),
-                                              contents[0])
+                prefix = 'jobs{1}.%s{1}.%s(1)' % (self.jobtype, self.jobname)
             else:
                 #curly brackets
-                mscript += self._generate_job('jobs{1}.%s{1}.%s{1}' %
-                                              (self.jobtype, self.jobname),
-                                              contents[0])
+                prefix = 'jobs{1}.%s{1}.%s{1}' % (self.jobtype, self.jobname)
+            mscript.append(self._generate_cached_job(prefix, contents[0]))
         else:
             jobdef = {'jobs': [{self.jobtype:
-                                  [{self.jobname:self.reformat_dict_for_savemat
+                                  [{self.jobname:self._reformat_dict_for_savemat
                                       (contents[0])}]}]}
-            savemat(os.path.join(cwd, 'pyjobs_%s.mat' % self.jobname), jobdef)
-            mscript += "load pyjobs_%s;\n\n" % self.jobname
-        mscript += """
+            jobfile = self._jobdef_file(cwd)
+            if os.path.dirname(jobfile) != cwd:
+                # temporary, removed by _run_interface
+                self._jobfile = jobfile
+            savemat(jobfile, jobdef, do_compression=False)
+            mscript.append("load('%s');\n" % jobfile)
+            mscript.append("\n")
+        mscript.append("""
         if strcmp(spm('ver'),'SPM8'),
            jobs=spm_jobman('spm5tospm8',{jobs});
         end
         spm_jobman(\'run_nogui\',jobs);\n
-        """
+        """)
         if postscript is not None:
-            mscript += postscript
-        return mscript
+            mscript.append(postscript)
+        return ''.join(mscript)
 
     @property
     def version(self):
@@ -122,7 +122,7 @@ class Level1Design(SPMCommand):
     def _parse_inputs(self):
         """validate spm realign options if set to None ignore
         """
-        einputs = super(Level1Design, self)._parse_inputs(skip=('mask_threshold'))
+        einputs = super(Level1Design, self)._parse_inputs(skip=('mask_threshold',))
         for sessinfo in einputs[0]['sess']:
             sessinfo['scans'] = scans_for_fnames(filename_to_list(sessinfo['scans']), keep4d=False)
         if not isdefined(self.inputs.spm_mat_dir):
@@ -205,7 +205,7 @@ class EstimateModel(SPMCommand):
     def _parse_inputs(self):
         """validate spm realign options if set to None ignore
         """
-        einputs = super(EstimateModel, self)._parse_inputs(skip=('flags'))
+        einputs = super(EstimateModel, self)._parse_inputs(skip=('flags',))
         if isdefined(self.inputs.flags):
             einputs[0].update(self.inputs.flags)
         return einputs
@@ -320,43 +320,43 @@ class EstimateContrast(SPMCommand):
                 contrasts[i].weights = cont[3]
             if len(cont) >= 5:
                 contrasts[i].sessions = cont[4]
-        script = "% generated by nipype.interfaces.spm\n"
-        script += "spm_defaults;\n"
-        script += "jobs{1}.stats{1}.con.spmmat  = {'%s'};\n" % self.inputs.spm_mat_file
-        script += "load(jobs{1}.stats{1}.con.spmmat{:});\n"
-        script += "SPM.swd = '%s';\n" % os.getcwd()
-        script += "save(jobs{1}.stats{1}.con.spmmat{:},'SPM');\n"
-        script += "names = SPM.xX.name;\n"
+        script = ["% generated by nipype.interfaces.spm\n"]
+        script.append("spm_defaults;\n")
+        script.append("jobs{1}.stats{1}.con.spmmat  = {'%s'};\n" % self.inputs.spm_mat_file)
+        script.append("load(jobs{1}.stats{1}.con.spmmat{:});\n")
+        script.append("SPM.swd = '%s';\n" % os.getcwd())
+        script.append("save(jobs{1}.stats{1}.con.spmmat{:},'SPM');\n")
+        script.append("names = SPM.xX.name;\n")
         # get names for columns
         if isdefined(self.inputs.group_contrast) and self.inputs.group_contrast:
-            script += "condnames=names;\n"
+            script.append("condnames=names;\n")
         else:
             if self.inputs.use_derivs:
-                script += "pat = 'Sn\([0-9*]\) (.*)';\n"
+                script.append("pat = 'Sn\([0-9*]\) (.*)';\n")
             else:
-                script += "pat = 'Sn\([0-9*]\) (.*)\*bf\(1\)|Sn\([0-9*]\) .*\*bf\([2-9]\)|Sn\([0-9*]\) (.*)';\n"
-            script += "t = regexp(names,pat,'tokens');\n"
+                script.append("pat = 'Sn\([0-9*]\) (.*)\*bf\(1\)|Sn\([0-9*]\) .*\*bf\([2-9]\)|Sn\([0-9*]\) (.*)';\n")
+            script.append("t = regexp(names,pat,'tokens');\n")
             # get sessidx for columns
-            script += "pat1 = 'Sn\(([0-9].*)\)\s.*';\n"
-            script += "t1 = regexp(names,pat1,'tokens');\n"
-            script += "for i0=1:numel(t),condnames{i0}='';condsess(i0)=0;if ~isempty(t{i0}{1}),condnames{i0} = t{i0}{1}{1};condsess(i0)=str2num(t1{i0}{1}{1});end;end;\n"
+            script.append("pat1 = 'Sn\(([0-9].*)\)\s.*';\n")
+            script.append("t1 = regexp(names,pat1,'tokens');\n")
+            script.append("for i0=1:numel(t),condnames{i0}='';condsess(i0)=0;if ~isempty(t{i0}{1}),condnames{i0} = t{i0}{1}{1};condsess(i0)=str2num(t1{i0}{1}{1});end;end;\n")
         # BUILD CONTRAST SESSION STRUCTURE
         for i, contrast in enumerate(contrasts):
             if contrast.stat == 'T':
-                script += "consess{%d}.tcon.name   = '%s';\n" % (i + 1, contrast.name)
-                script += "consess{%d}.tcon.convec = zeros(1,numel(names));\n" % (i + 1)
+                script.append("consess{%d}.tcon.name   = '%s';\n" % (i + 1, contrast.name))
+                script.append("consess{%d}.tcon.convec = zeros(1,numel(names));\n" % (i + 1))
                 for c0, cond in enumerate(contrast.conditions):
-                    script += "idx = strmatch('%s',condnames,'exact');\n" % (cond)
-                    script += "if isempty(idx), throw(MException('CondName:Chk', sprintf('Condition %%s not found in design','%s'))); end;\n" % cond
+                    script.append("idx = strmatch('%s',condnames,'exact');\n" % (cond))
+                    script.append("if isempty(idx), throw(MException('CondName:Chk', sprintf('Condition %%s not found in design','%s'))); end;\n" % cond)
                     if contrast.sessions:
                         for sno, sw in enumerate(contrast.sessions):
-                            script += "sidx = find(condsess(idx)==%d);\n" % (sno + 1)
-                            script += "consess{%d}.tcon.convec(idx(sidx)) = %f;\n" % (i + 1, sw * contrast.weights[c0])
+                            script.append("sidx = find(condsess(idx)==%d);\n" % (sno + 1))
+                            script.append("consess{%d}.tcon.convec(idx(sidx)) = %f;\n" % (i + 1, sw * contrast.weights[c0]))
                     else:
-                        script += "consess{%d}.tcon.convec(idx) = %f;\n" % (i + 1, contrast.weights[c0])
+                        script.append("consess{%d}.tcon.convec(idx) = %f;\n" % (i + 1, contrast.weights[c0]))
         for i, contrast in enumerate(contrasts):
             if contrast.stat == 'F':
-                script += "consess{%d}.fcon.name   =  '%s';\n" % (i + 1, contrast.name)
+                script.append("consess{%d}.fcon.name   =  '%s';\n" % (i + 1, contrast.name))
                 for cl0, fcont in enumerate(contrast.conditions):
                     try:
                         tidx = cname.index(fcont[0])
@@ -364,11 +364,11 @@ class EstimateContrast(SPMCommand):
                         Exception("Contrast Estimate: could not get index of" \
                                   " T contrast. probably not defined prior " \
                                       "to the F contrasts")
-                    script += "consess{%d}.fcon.convec{%d} = consess{%d}.tcon.convec;\n" % (i + 1, cl0 + 1, tidx + 1)
-        script += "jobs{1}.stats{1}.con.consess = consess;\n"
-        script += "if strcmp(spm('ver'),'SPM8'), spm_jobman('initcfg');jobs=spm_jobman('spm5tospm8',{jobs});end\n"
-        script += "spm_jobman('run',jobs);"
-        return script
+                    script.append("consess{%d}.fcon.convec{%d} = consess{%d}.tcon.convec;\n" % (i + 1, cl0 + 1, tidx + 1))
+        script.append("jobs{1}.stats{1}.con.consess = consess;\n")
+        script.append("if strcmp(spm('ver'),'SPM8'), spm_jobman('initcfg');jobs=spm_jobman('spm5tospm8',{jobs});end\n")
+        script.append("spm_jobman('run',jobs);")
+        return ''.join(script)
 
     def _list_outputs(self):
         outputs = self._outputs().get()
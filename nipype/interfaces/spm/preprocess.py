@@ -24,8 +24,9 @@ from nipype.interfaces.base import (OutputMultiPath, TraitedSpec, isdefined,
 from nipype.interfaces.spm.base import (SPMCommand, scans_for_fname,
                                         func_is_3d,
                                         scans_for_fnames, SPMCommandInputSpec)
-from nipype.utils.filemanip import (fname_presuffix, filename_to_list,
-                                    list_to_filename, split_filename)
+from nipype.utils.filemanip import (fname_presuffix, fnames_presuffix,
+                                    filename_to_list, list_to_filename,
+                                    split_filename)
 
 
 class SliceTimingInputSpec(SPMCommandInputSpec):
@@ -270,7 +271,7 @@ class CoregisterInputSpec(SPMCommandInputSpec):
                              desc='sampling separation in mm')
     tolerance = traits.List(traits.Float(), field='eoptions.tol',
                         desc='acceptable tolerance for each of 12 params')
-    write_interp = traits.Range(low=0, hign=7, field='roptions.interp',
+    write_interp = traits.Range(low=0, high=7, field='roptions.interp',
                         desc='degree of b-spline used for interpolation')
     write_wrap = traits.List(traits.Int(), minlen=3, maxlen=3,
                              field='roptions.wrap',
@@ -330,7 +331,7 @@ class Coregister(SPMCommand):
         if self.inputs.jobtype == "write":
             einputs = super(Coregister, self)._parse_inputs(skip=('jobtype', 'apply_to_files'))
         else:
-            einputs = super(Coregister, self)._parse_inputs(skip=('jobtype'))
+            einputs = super(Coregister, self)._parse_inputs(skip=('jobtype',))
         jobtype = self.inputs.jobtype
         return [{'%s' % (jobtype): einputs[0]}]
 
@@ -343,13 +344,13 @@ class Coregister(SPMCommand):
             outputs['coregistered_source'] = self.inputs.source
         elif self.inputs.jobtype == "write" or self.inputs.jobtype == "estwrite":
             if isdefined(self.inputs.apply_to_files):
-                outputs['coregistered_files'] = []
-                for imgf in filename_to_list(self.inputs.apply_to_files):
-                    outputs['coregistered_files'].append(fname_presuffix(imgf, prefix=self.inputs.out_prefix))
+                outputs['coregistered_files'] = fnames_presuffix(
+                    filename_to_list(self.inputs.apply_to_files),
+                    prefix=self.inputs.out_prefix)
 
-            outputs['coregistered_source'] = []
-            for imgf in filename_to_list(self.inputs.source):
-                outputs['coregistered_source'].append(fname_presuffix(imgf, prefix=self.inputs.out_prefix))
+            outputs['coregistered_source'] = fnames_presuffix(
+                filename_to_list(self.inputs.source),
+                prefix=self.inputs.out_prefix)
 
         return outputs
 
@@ -396,9 +397,10 @@ class NormalizeInputSpec(SPMCommandInputSpec):
     write_voxel_sizes = traits.List(traits.Float(), field='roptions.vox',
                                     minlen=3, maxlen=3,
                                     desc='3-element list (opt)')
-    write_interp = traits.Range(low=0, hign=7, field='roptions.interp',
+    write_interp = traits.Range(low=0, high=7, field='roptions.interp',
                         desc='degree of b-spline used for interpolation')
     write_wrap = traits.List(traits.Int(), field='roptions.wrap',
+                        minlen=3, maxlen=3,
                         desc=('Check if interpolation should wrap in [x,y,z] '
                               '- list of bools (opt)'))
     out_prefix = traits.String('w', field='roptions.prefix', usedefault=True,
@@ -441,9 +443,6 @@ class Normalize(SPMCommand):
             return scans_for_fnames(filename_to_list(val))
         if opt == 'parameter_file':
             return np.array([list_to_filename(val)], dtype=object)
-        if opt in ['write_wrap']:
-            if len(val) != 3:
-                raise ValueError('%s must have 3 elements' % opt)
         return super(Normalize, self)._format_arg(opt, spec, val)
 
     def _parse_inputs(self):
@@ -468,10 +467,9 @@ class Normalize(SPMCommand):
 
         jobtype = self.inputs.jobtype
         if jobtype.startswith('est'):
-            outputs['normalization_parameters'] = []
-            for imgf in filename_to_list(self.inputs.source):
-                outputs['normalization_parameters'].append(fname_presuffix(imgf, suffix='_sn.mat', use_ext=False))
-            outputs['normalization_parameters'] = list_to_filename(outputs['normalization_parameters'])
+            outputs['normalization_parameters'] = list_to_filename(
+                fnames_presuffix(filename_to_list(self.inputs.source),
+                                 suffix='_sn.mat', use_ext=False))
 
         if self.inputs.jobtype == "estimate":
             if isdefined(self.inputs.apply_to_files):
@@ -480,13 +478,14 @@ class Normalize(SPMCommand):
         elif 'write' in self.inputs.jobtype:
             outputs['normalized_files'] = []
             if isdefined(self.inputs.apply_to_files):
-                for imgf in filename_to_list(self.inputs.apply_to_files):
-                    outputs['normalized_files'].append(fname_presuffix(imgf, prefix=self.inputs.out_prefix))
+                outputs['normalized_files'] = fnames_presuffix(
+                    filename_to_list(self.inputs.apply_to_files),
+                    prefix=self.inputs.out_prefix)
 
             if isdefined(self.inputs.source):
-                outputs['normalized_source'] = []
-                for imgf in filename_to_list(self.inputs.source):
-                    outputs['normalized_source'].append(fname_presuffix(imgf, prefix=self.inputs.out_prefix))
+                outputs['normalized_source'] = fnames_presuffix(
+                    filename_to_list(self.inputs.source),
+                    prefix=self.inputs.out_prefix)
 
         return outputs
 
@@ -821,6 +820,13 @@ class Smooth(SPMCommand):
     >>> smooth.inputs.in_files = 'functional.nii'
     >>> smooth.inputs.fwhm = [4, 4, 4]
     >>> smooth.run() # doctest: +SKIP
+
+    All volumes of all `in_files` are smoothed by a single SPM job, so
+    it is much faster to pass a list of files than to smooth each file
+    in its own run (e.g. with a MapNode).
+
+    >>> smooth.inputs.in_files = ['functional.nii', 'functional2.nii']
+    >>> smooth.run() # doctest: +SKIP
     """
 
     input_spec = SmoothInputSpec
@@ -829,25 +835,21 @@ class Smooth(SPMCommand):
     _jobname = 'smooth'
 
     def _format_arg(self, opt, spec, val):
-        if opt in ['in_files']:
+        if opt == 'in_files':
             return scans_for_fnames(filename_to_list(val))
         if opt == 'fwhm':
             if not isinstance(val, list):
                 return [val, val, val]
-            if isinstance(val, list):
-                if len(val) == 1:
-                    return [val[0], val[0], val[0]]
-                else:
-                    return val
-
+            if len(val) == 1:
+                return [val[0], val[0], val[0]]
+            return val
         return super(Smooth, self)._format_arg(opt, spec, val)
 
     def _list_outputs(self):
         outputs = self._outputs().get()
-        outputs['smoothed_files'] = []
-
-        for imgf in filename_to_list(self.inputs.in_files):
-            outputs['smoothed_files'].append(fname_presuffix(imgf, prefix=self.inputs.out_prefix))
+        outputs['smoothed_files'] = fnames_presuffix(
+            filename_to_list(self.inputs.in_files),
+            prefix=self.inputs.out_prefix)
         return outputs
 
 
@@ -1430,4 +1432,4 @@ class VBMSegment(SPMCommand):
             einputs[0]['estwrite']['extopts']['dartelwarp'] = {'normlow': 1}
             return einputs
         else:
-            return super(VBMSegment, self)._parse_inputs(skip=('spatial_normalization'))
+            return super(VBMSegment, self)._parse_inputs(skip=('spatial_normalization',))
@@ -6,8 +6,10 @@ from shutil import rmtree
 
 import nibabel as nb
 import numpy as np
+from scipy.io import loadmat
 
-from nipype.testing import (assert_equal, assert_false, assert_true, skipif)
+from nipype.testing import (assert_equal, assert_false, assert_true,
+                            assert_raises, skipif)
 import nipype.interfaces.spm.base as spm
 from nipype.interfaces.spm import no_spm
 import nipype.interfaces.matlab as mlab
@@ -51,6 +53,45 @@ def test_scan_for_fnames():
     clean_directory(outdir, cwd)
 
 
+def test_scans_for_fname():
+    filelist, outdir, cwd = create_files_in_directory()
+    names = spm.scans_for_fname(filelist[0])
+    yield assert_equal, list(names), ['a.nii,%d' % i for i in range(1, 5)]
+    names = spm.scans_for_fnames(filelist)
+    yield assert_equal, len(names), 8
+    yield assert_equal, names[4], 'b.nii,1'
+    # tuples are handled like lists
+    names = spm.scans_for_fnames(tuple(filelist))
+    yield assert_equal, len(names), 8
+    names = spm.scans_for_fname(tuple(filelist))
+    yield assert_equal, list(names), ['a.nii,1', 'b.nii,1']
+    clean_directory(outdir, cwd)
+
+
+def test_shape_cache():
+    filelist, outdir, cwd = create_files_in_directory()
+    loaded = []
+    old_load = spm.load
+
+    def counting_load(fname):
+        loaded.append(fname)
+        return old_load(fname)
+    spm.load = counting_load
+    try:
+        spm.scans_for_fnames(filelist)
+        spm.scans_for_fnames(filelist)
+        # each header is read once
+        yield assert_equal, sorted(loaded), filelist
+        # a modified file is read again
+        os.utime(filelist[0], (0, 0))
+        names = spm.scans_for_fnames(filelist)
+        yield assert_equal, sorted(loaded), [filelist[0]] + filelist
+        yield assert_equal, len(names), 8
+    finally:
+        spm.load = old_load
+        clean_directory(outdir, cwd)
+
+
 save_time = False
 if not save_time:
     @skipif(no_spm)
@@ -61,6 +102,70 @@ if not save_time:
             yield assert_true, 'spm' in spm_path
 
 
+def test_spm_version_cache():
+    version = dict(path='/spm', name='SPM8', release='1234')
+    key = 'nipype_test_matlab|%s' % os.environ.get('MATLABPATH', '')
+    spm.Info._version_cache[key] = version
+    yield assert_equal, spm.Info.version('nipype_test_matlab'), version
+    del spm.Info._version_cache[key]
+
+
+def test_spm_version_disk_cache():
+    tmpdir = mkdtemp()
+    matlab = os.path.join(tmpdir, 'matlab')
+    open(matlab, 'w').write('#!/bin/sh\n')
+    os.chmod(matlab, 0755)
+    spm_path = os.path.join(tmpdir, 'spm8')
+    os.mkdir(spm_path)
+    spm_m = os.path.join(spm_path, 'spm.m')
+    open(spm_m, 'w').write('% spm\n')
+    queries = []
+
+    def query_version(matlab_cmd):
+        queries.append(matlab_cmd)
+        return dict(path=spm_path, name='SPM8', release='%d' % len(queries))
+    old_query_version = spm.Info._query_version
+    old_data_file = spm.config.data_file
+    spm.Info._query_version = staticmethod(query_version)
+    spm.config.data_file = os.path.join(tmpdir, 'nipype.json')
+    try:
+        version = spm.Info.version(matlab)
+        yield assert_equal, version['release'], '1'
+        # read back from disk in a new process (empty memory cache)
+        spm.Info._version_cache.clear()
+        yield assert_equal, spm.Info.version(matlab), version
+        yield assert_equal, len(queries), 1
+        # updating SPM in place invalidates the record
+        spm.Info._version_cache.clear()
+        os.utime(spm_m, (0, 0))
+        yield assert_equal, spm.Info.version(matlab)['release'], '2'
+        # as does a new matlab executable
+        spm.Info._version_cache.clear()
+        os.utime(matlab, (0, 0))
+        yield assert_equal, spm.Info.version(matlab)['release'], '3'
+        spm.Info._version_cache.clear()
+        yield assert_equal, spm.Info.version(matlab)['release'], '3'
+    finally:
+        spm.Info._query_version = old_query_version
+        spm.config.data_file = old_data_file
+        spm.Info._version_cache.clear()
+        rmtree(tmpdir)
+
+
+def test_spm_version_no_session():
+    def get_persistent_session(matlab_cmd):
+        raise AssertionError('session requested for %s' % matlab_cmd)
+    old_get_persistent_session = mlab.get_persistent_session
+    mlab.get_persistent_session = get_persistent_session
+    mlab.use_persistent_sessions()
+    try:
+        # runs (and fails) without a session
+        yield assert_equal, spm.Info.version('nipype_no_such_matlab'), None
+    finally:
+        mlab.use_persistent_sessions(False)
+        mlab.get_persistent_session = old_get_persistent_session
+
+
 def test_use_mfile():
     class TestClass(spm.SPMCommand):
         input_spec = spm.SPMCommandInputSpec
@@ -112,6 +217,11 @@ def test_generate_job():
     contents = {'files': names}
     out = dc._generate_job(prefix='test', contents=contents)
     yield assert_equal, out, "test.files = {...\n'a.nii';...\n'b.nii';...\n};\n"
+    # cell array of cell arrays of strings
+    names = spm.scans_for_fnames(filelist, keep4d=True, separate_sessions=True)
+    out = dc._generate_job(prefix='test', contents={'sess': names})
+    yield assert_equal, out, ("test.sess = {...\n{...\n'a.nii';...\n};\n"
+                              "{...\n'b.nii';...\n};\n};\n")
     clean_directory(outdir, cwd)
     # string assignment
     contents = 'foo'
@@ -122,6 +232,12 @@ def test_generate_job():
     contents['onsets'][0] = [1, 2, 3, 4]
     out = dc._generate_job(prefix='test', contents=contents)
     yield assert_equal, out, 'test.onsets = {...\n[1, 2, 3, 4];...\n};\n'
+    # nested structures deeper than the recursion limit
+    contents = 1
+    for _ in range(2000):
+        contents = {'a': contents}
+    out = dc._generate_job(prefix='test', contents=contents)
+    yield assert_equal, out, 'test%s = 1;\n' % ('.a' * 2000)
 
 def test_bool():
     class TestClassInputSpec(SPMCommandInputSpec):
@@ -146,4 +262,55 @@ def test_make_matlab_command():
     contents = {'contents': [1, 2, 3, 4]}
     script = dc._make_matlab_command([contents])
     yield assert_true, 'jobs{1}.jobtype{1}.jobname{1}.contents(3) = 3;' in script
+    # identical jobs reuse the generated code
+    hits = spm._job_cache_stats['hits']
+    yield assert_equal, dc._make_matlab_command([contents]), script
+    yield assert_equal, spm._job_cache_stats['hits'], hits + 1
+    # file names are part of the key
+    names = spm.scans_for_fnames(filelist)
+    key = spm._freeze_job({'data': names})
+    yield assert_equal, key, spm._freeze_job({'data': names.copy()})
+    yield assert_false, key == spm._freeze_job({'data': names[::-1]})
+    yield assert_false, key == spm._freeze_job({'data': list(names)})
+    # so are the field names of struct arrays
+    values = np.array([(1, 2)], dtype=[('a', int), ('b', int)])
+    yield assert_false, spm._freeze_job(values) == \
+        spm._freeze_job(np.array([(1, 2)], dtype=[('c', int), ('d', int)]))
+    # huge jobs are not kept
+    old_max_chars = spm._job_cache_max_chars
+    spm._job_cache_max_chars = 800
+    dc._make_matlab_command([{'contents': range(100)}])
+    misses = spm._job_cache_stats['misses']
+    dc._make_matlab_command([{'contents': range(100)}])
+    yield assert_equal, spm._job_cache_stats['misses'], misses + 1
+    spm._job_cache_max_chars = old_max_chars
+    clean_directory(outdir, cwd)
+
+
+def test_make_matlab_command_mat():
+    class TestClass(spm.SPMCommand):
+        _jobtype = 'jobtype'
+        _jobname = 'jobname'
+        input_spec = spm.SPMCommandInputSpec
+    dc = TestClass()  # dc = derived_class
+    dc.inputs.mfile = False
+    filelist, outdir, cwd = create_files_in_directory()
+    script = dc._make_matlab_command([{'contents': [1, 2, 3, 4]}])
+    jobfile = script.split("load('")[1].split("');")[0]
+    yield assert_true, os.path.isabs(jobfile)
+    yield assert_true, 'jobs' in loadmat(jobfile)
+    if os.path.exists(jobfile):
+        os.unlink(jobfile)
+
+    # the job file is removed even if matlab fails
+    jobfiles = []
+
+    def failing_run():
+        jobfiles.append(dc._jobfile)
+        raise RuntimeError('matlab failed')
+    dc.mlab.run = failing_run
+    yield assert_raises, RuntimeError, dc._run_interface, None
+    if jobfiles[0] is not None:
+        yield assert_false, os.path.exists(jobfiles[0])
+    yield assert_equal, dc._jobfile, None
     clean_directory(outdir, cwd)
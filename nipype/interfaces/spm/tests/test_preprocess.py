@@ -12,6 +12,7 @@ import nibabel as nb
 import nipype.interfaces.spm as spm
 from nipype.interfaces.spm import no_spm
 import nipype.interfaces.matlab as mlab
+from nipype.interfaces.base import TraitError
 
 try:
     matlab_cmd = os.environ['MATLABCMD']
@@ -152,6 +153,9 @@ def test_normalize():
     for key, metadata in input_map.items():
         for metakey, value in metadata.items():
             yield assert_equal, getattr(norm.inputs.traits()[key], metakey), value
+    # lengths are checked when the input is set
+    yield assert_raises, TraitError, setattr, norm.inputs, 'write_wrap', [1, 0]
+    yield assert_raises, TraitError, setattr, norm.inputs, 'write_interp', 8
 
 def test_normalize_list_outputs():
     filelist, outdir, cwd = create_files_in_directory()
@@ -217,6 +221,18 @@ def test_smooth():
         for metakey, value in metadata.items():
             yield assert_equal, getattr(instance.inputs.traits()[key], metakey), value
 
+def test_smooth_list():
+    filelist, outdir, cwd = create_files_in_directory()
+    smooth = spm.Smooth(in_files=filelist, fwhm=4)
+    job = smooth._parse_inputs()[0]
+    yield assert_equal, list(job['data']), ['%s,%d' % (f, i) for f in filelist
+                                            for i in range(1, 5)]
+    yield assert_equal, job['fwhm'], [4, 4, 4]
+    script = smooth._make_matlab_command(smooth._parse_inputs())
+    yield assert_true, 'jobs{1}.spatial{1}.smooth(1).data = {' in script
+    yield assert_false, 'jobs{2}' in script
+    clean_directory(outdir, cwd)
+
 def test_dartel():
     yield assert_equal, spm.DARTEL._jobtype, 'tools'
     yield assert_equal, spm.DARTEL._jobname, 'dartel'
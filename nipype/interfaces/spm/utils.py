@@ -228,7 +228,7 @@ class ApplyInverseDeformationInput(SPMCommandInputSpec):
         desc='SN SPM deformation file',
         xor=['deformation'])
     interpolation = traits.Range(
-        low=0, hign=7, field='interp',
+        low=0, high=7, field='interp',
         desc='degree of b-spline used for interpolation')
 
     bounding_box = traits.List(
@@ -300,7 +300,7 @@ class ResliceToReferenceInput(SPMCommandInputSpec):
         field='comp{1}.id.space',
         desc='File defining target space')
     interpolation = traits.Range(
-        low=0, hign=7, field='interp',
+        low=0, high=7, field='interp',
         desc='degree of b-spline used for interpolation')
 
     bounding_box = traits.List(
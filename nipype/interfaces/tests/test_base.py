@@ -58,6 +58,21 @@ def test_bunch_hash():
     yield assert_equal, newbdict['yat'], True
 
 
+def test_interfaceresult_pickle():
+    import cPickle
+    runtime = nib.Bunch(returncode=0)
+    res = nib.InterfaceResult(nib.BaseInterface, runtime,
+                              inputs={'a': 1})
+    yield assert_false, hasattr(res, '__dict__')
+    for protocol in (0, 2):
+        newres = cPickle.loads(cPickle.dumps(res, protocol))
+        yield assert_equal, newres.interface, nib.BaseInterface
+        yield assert_equal, newres.runtime.returncode, 0
+        yield assert_equal, newres.inputs, {'a': 1}
+        yield assert_equal, newres.outputs, None
+        yield assert_equal, newres.version, 1.0
+
+
 # create a temp file
 #global tmp_infile, tmp_dir
 #tmp_infile = None
@@ -1,6 +1,7 @@
 # emacs: -*- mode: python; py-indent-offset: 4; indent-tabs-mode: nil -*-
 # vi: set ft=python sts=4 ts=4 sw=4 et:
 import os
+import threading
 from tempfile import mkdtemp
 from shutil import rmtree
 
@@ -36,6 +37,15 @@ def test_cmdline():
     rmtree(basedir)
 
 
+def test_find_matlab():
+    yield assert_equal, mlab.find_matlab('nipype_no_such_matlab -nosplash'), \
+        None
+    yield assert_equal, mlab.find_matlab(''), None
+    yield assert_equal, mlab.find_matlab('  '), None
+    if not no_matlab:
+        yield assert_true, os.path.isfile(mlab.find_matlab(matlab_cmd))
+
+
 @skipif(no_matlab)
 def test_mlab_inputspec():
     spec = mlab.MatlabInputSpec()
@@ -58,6 +68,23 @@ def test_mlab_init():
     yield assert_equal, mc.cmd, 'foo_m'
 
 
+def test_mfile():
+    cwd = os.getcwd()
+    basedir = mkdtemp()
+    os.chdir(basedir)
+    mc = mlab.MatlabCommand(matlab_cmd='foo_m', script_file='testscript.m',
+                            mfile=True)
+    script = mc._gen_matlab_command('%s', 'a=1;\n')
+    yield assert_equal, script, "addpath('%s');testscript" % os.getcwd()
+    mfile = open('testscript.m').read()
+    yield assert_true, mfile.startswith("fprintf(1,'Executing %s at")
+    yield assert_true, mfile.endswith('\n'.join(mc.inputs.prescript) +
+                                      'a=1;\n' +
+                                      '\n'.join(mc.inputs.postscript))
+    os.chdir(cwd)
+    rmtree(basedir)
+
+
 @skipif(no_matlab)
 def test_run_interface():
     mc = mlab.MatlabCommand(matlab_cmd='foo_m')
@@ -83,3 +110,108 @@ def test_set_matlabcmd():
     mi.set_default_matlab_cmd('foo')
     yield assert_equal, mi._default_matlab_cmd, 'foo'
     mi.set_default_matlab_cmd(matlab_cmd)
+
+
+@skipif(no_matlab)
+def test_session():
+    cwd = os.getcwd()
+    basedir = mkdtemp()
+    os.chdir(basedir)
+    with mlab.MatlabSession() as session:
+        yield assert_equal, mlab.get_active_session(), session
+        res = mlab.MatlabCommand(script='a=1;', mfile=True).run()
+        yield assert_equal, res.runtime.returncode, 0
+        mc = mlab.MatlabCommand(script='foo;', mfile=True)
+        yield assert_raises, RuntimeError, mc.run
+        # the session survives failing scripts
+        out = session.run_script("fprintf(1, 'nipype%d', 1);")
+        yield assert_true, 'nipype1' in out
+        # variables do not leak from one script into the next
+        session.run_script("nipype_a = 1;")
+        out = session.run_script("fprintf(1, 'nipype%d', "
+                                 "exist('nipype_a', 'var'));")
+        yield assert_true, 'nipype0' in out
+    yield assert_equal, mlab.get_active_session(), None
+    os.chdir(cwd)
+    rmtree(basedir)
+
+
+def test_persistent_session():
+    # matlab is only started when the session runs a script
+    session = mlab.get_persistent_session('nipype_test_matlab')
+    yield assert_true, session is \
+        mlab.get_persistent_session('nipype_test_matlab')
+    yield assert_equal, session.matlab_cmd, 'nipype_test_matlab'
+    yield assert_false, session is mlab.get_persistent_session('matlab')
+    mlab.close_persistent_sessions()
+    yield assert_false, session is \
+        mlab.get_persistent_session('nipype_test_matlab')
+    mlab.close_persistent_sessions()
+
+
+@skipif(no_matlab)
+def test_session_threads():
+    outputs = {}
+    with mlab.MatlabSession() as session:
+        def run(i):
+            outputs[i] = session.run_script("fprintf(1, 'nipype%%d', %d);" %
+                                            i)
+        threads = [threading.Thread(target=run, args=(i,)) for i in (1, 2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    yield assert_true, 'nipype1' in outputs[1]
+    yield assert_false, 'nipype2' in outputs[1]
+    yield assert_true, 'nipype2' in outputs[2]
+    yield assert_false, 'nipype1' in outputs[2]
+
+
+def test_persistent_session_threads():
+    sessions = []
+
+    def get_session():
+        sessions.append(mlab.get_persistent_session('nipype_test_matlab'))
+    threads = [threading.Thread(target=get_session) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    yield assert_equal, len(set([id(session) for session in sessions])), 1
+    mlab.close_persistent_sessions()
+
+
+def test_session_matlab_cmd():
+    # matlab is only started when a session runs a script
+    with mlab.MatlabSession(matlab_cmd='nipype_test_matlab') as session:
+        mc = mlab.MatlabCommand(matlab_cmd='nipype_test_matlab')
+        yield assert_true, mc._get_session() is session
+        # other matlab commands start their own matlab
+        mc = mlab.MatlabCommand(matlab_cmd='nipype_other_matlab')
+        yield assert_equal, mc._get_session(), None
+        mlab.use_persistent_sessions()
+        other = mc._get_session()
+        yield assert_equal, other.matlab_cmd, 'nipype_other_matlab'
+        yield assert_true, other is \
+            mlab.get_persistent_session('nipype_other_matlab')
+        mlab.use_persistent_sessions(False)
+        mc = mlab.MatlabCommand(matlab_cmd='nipype_test_matlab',
+                                uses_mcr=True)
+        yield assert_equal, mc._get_session(), None
+    mlab.close_persistent_sessions()
+
+
+def test_session_default_cmd():
+    # MATLABCMD does not change the default of either, so they match
+    old_matlabcmd = os.environ.get('MATLABCMD')
+    os.environ['MATLABCMD'] = 'nipype_env_matlab'
+    try:
+        with mlab.MatlabSession() as session:
+            mc = mlab.MatlabCommand()
+            yield assert_equal, session.matlab_cmd, mc._cmd
+            yield assert_true, mc._get_session() is session
+    finally:
+        if old_matlabcmd is None:
+            del os.environ['MATLABCMD']
+        else:
+            os.environ['MATLABCMD'] = old_matlabcmd
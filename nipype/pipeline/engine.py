@@ -1488,7 +1488,7 @@ class Node(WorkflowBase):
                     needed_outputs=self.needed_outputs)
                 runtime = Bunch(cwd=cwd,
                                 returncode=0,
-                                environ=deepcopy(os.environ.data),
+                                environ=dict(os.environ),
                                 hostname=gethostname())
                 result = InterfaceResult(
                     interface=self._interface.__class__,
@@ -1508,7 +1508,7 @@ class Node(WorkflowBase):
             self._originputs = deepcopy(self._interface.inputs)
         if execute:
             runtime = Bunch(returncode=1,
-                            environ=deepcopy(os.environ.data),
+                            environ=dict(os.environ),
                             hostname=gethostname())
             result = InterfaceResult(
                 interface=self._interface.__class__,
@@ -7,6 +7,7 @@ http://stackoverflow.com/a/8963618/1183453
 """
 
 from multiprocessing import Process, Pool, cpu_count, pool
+from multiprocessing.util import Finalize
 from traceback import format_exception
 import sys
 
@@ -22,6 +23,19 @@ def run_node(node, updatehash):
         result['result'] = node.result
     return result
 
+def init_matlab_session():
+    """Makes the calling worker process keep matlab running
+
+    Every matlab (e.g. SPM) node of the worker runs in the persistent
+    session for its matlab command. matlab is only started when the
+    worker runs its first node with that command and is stopped when
+    the worker exits.
+    """
+    from ...interfaces.matlab import (use_persistent_sessions,
+                                      close_persistent_sessions)
+    use_persistent_sessions()
+    Finalize(None, close_persistent_sessions, exitpriority=10)
+
 class NonDaemonProcess(Process):
     """A non-daemon process to support internal multiprocessing.
     """
@@ -46,6 +60,9 @@ class MultiProcPlugin(DistributedPluginBase):
 
     - n_procs : number of processes to use
     - non_daemon : boolean flag to execute as non-daemon processes
+    - matlab_session : boolean flag to keep one matlab process per worker
+      that runs all matlab/SPM nodes submitted to that worker, instead of
+      starting matlab for every node
 
     """
 
@@ -55,16 +72,20 @@ class MultiProcPlugin(DistributedPluginBase):
         self._taskid = 0
         non_daemon = True
         n_procs = cpu_count()
+        initializer = None
         if plugin_args:
             if 'n_procs' in plugin_args:
                 n_procs = plugin_args['n_procs']
             if 'non_daemon' in plugin_args:
                 non_daemon = plugin_args['non_daemon']
+            if plugin_args.get('matlab_session'):
+                initializer = init_matlab_session
         if non_daemon:
             # run the execution using the non-daemon pool subclass
-            self.pool = NonDaemonPool(processes=n_procs)
+            self.pool = NonDaemonPool(processes=n_procs,
+                                      initializer=initializer)
         else:
-            self.pool = Pool(processes=n_procs)
+            self.pool = Pool(processes=n_procs, initializer=initializer)
 
     def _get_result(self, taskid):
         if taskid not in self._taskresult:
@@ -3,8 +3,11 @@ import nipype.interfaces.base as nib
 from tempfile import mkdtemp
 from shutil import rmtree
 
-from nipype.testing import assert_equal
+from nipype.testing import assert_equal, assert_true
 import nipype.pipeline.engine as pe
+import nipype.interfaces.matlab as mlab
+from nipype.pipeline.plugins.multiproc import (MultiProcPlugin,
+                                               init_matlab_session)
 
 class InputSpec(nib.TraitedSpec):
     input1 = nib.traits.Int(desc='a random int')
@@ -45,4 +48,22 @@ def test_run_multiproc():
     result = node.get_output('output1')
     yield assert_equal, result, [1, 1]
     os.chdir(cur_dir)
-    rmtree(temp_dir)
\ No newline at end of file
+    rmtree(temp_dir)
+
+def test_matlab_session():
+    plugin = MultiProcPlugin(plugin_args={'n_procs': 1,
+                                          'matlab_session': True})
+    yield assert_equal, plugin.pool._initializer, init_matlab_session
+    plugin.pool.terminate()
+    plugin = MultiProcPlugin(plugin_args={'n_procs': 1})
+    yield assert_equal, plugin.pool._initializer, None
+    plugin.pool.terminate()
+    # what the initializer does in a worker; matlab is not started
+    init_matlab_session()
+    mc = mlab.MatlabCommand(matlab_cmd='nipype_test_matlab')
+    session = mc._get_session()
+    yield assert_equal, session.matlab_cmd, 'nipype_test_matlab'
+    yield assert_true, session is \
+        mlab.get_persistent_session('nipype_test_matlab')
+    mlab.use_persistent_sessions(False)
+    mlab.close_persistent_sessions()
@@ -38,6 +38,7 @@ job_finished_timeout = 5
 keep_inputs = false
 local_hash_check = true
 matplotlib_backend = Agg
+persistent_matlab = false
 plugin = Linear
 remove_node_directories = false
 remove_unnecessary_outputs = true
@@ -76,9 +76,10 @@ def split_filename(fname):
     pth, fname = os.path.split(fname)
 
     ext = None
+    lower_fname = fname.lower()
     for special_ext in special_extensions:
         ext_len = len(special_ext)
-        if len(fname) > ext_len and fname[-ext_len:].lower() == special_ext.lower():
+        if len(fname) > ext_len and lower_fname.endswith(special_ext):
             ext = fname[-ext_len:]
             fname = fname[:-ext_len]
             break
@@ -125,10 +126,11 @@ def fname_presuffix(fname, prefix='', suffix='', newpath=None, use_ext=True):
 def fnames_presuffix(fnames, prefix='', suffix='', newpath=None,use_ext=True):
     """Calls fname_presuffix for a list of files.
     """
-    f2 = []
-    for fname in fnames:
-        f2.append(fname_presuffix(fname, prefix, suffix, newpath, use_ext))
-    return f2
+    # resolve a relative newpath once rather than for every file
+    if newpath and isdefined(newpath):
+        newpath = os.path.abspath(newpath)
+    return [fname_presuffix(fname, prefix, suffix, newpath, use_ext)
+            for fname in fnames]
 
 def hash_rename(filename, hash):
     """renames a file given original filename and hash
@@ -222,11 +224,11 @@ def copyfile(originalfile, newfile, copy=False, create_new=False, hashmethod=Non
         fmlogger.debug("File: %s already exists,%s, copy:%d" \
                            % (newfile, newhash, copy))
     #the following seems unnecessary
-    #if os.name is 'posix' and copy:
+    #if os.name == 'posix' and copy:
     #    if os.path.lexists(newfile) and os.path.islink(newfile):
     #        os.unlink(newfile)
     #        newhash = None
-    if os.name is 'posix' and not copy:
+    if os.name == 'posix' and not copy:
         if os.path.lexists(newfile):
             if hashmethod == 'timestamp':
                 orighash = hash_timestamp(originalfile)
@@ -39,6 +39,9 @@ def test_fnames_presuffix():
     fnames = ['foo.nii', 'bar.nii']
     pths = fnames_presuffix(fnames, 'pre_', '_post', '/tmp')
     yield assert_equal, pths, ['/tmp/pre_foo_post.nii', '/tmp/pre_bar_post.nii']
+    pths = fnames_presuffix(fnames, newpath='tmp', use_ext=False)
+    yield assert_equal, pths, [os.path.join(os.getcwd(), 'tmp', 'foo'),
+                               os.path.join(os.getcwd(), 'tmp', 'bar')]
 
 def test_hash_rename():
     new_name = hash_rename('foobar.nii', 'abc123')